@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query
 from pydantic import BaseModel
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Union
+from datetime import date, datetime
 import os
 
 from src.services.chat_service import ChatService
+from src.services.request_coalescer import IdempotencyConflict, RequestCoalescer
 
 # 🟢 INITIALIZE ROUTER & SERVICE
 router = APIRouter(prefix="/api/v1/chat", tags=["Sarah AI Assistant"])
 chat_service = ChatService()
+# 🟢 SINGLE-FLIGHT: Collapses duplicate widget calls (double mounts, double clicks)
+coalescer = RequestCoalescer()
 
 # --- PYDANTIC SCHEMAS ---
 class ChatRequest(BaseModel):
@@ -19,24 +23,42 @@ class ChatResponse(BaseModel):
     intent: str
     file_url: Optional[str] = None
 
+class HistorySearchResponse(BaseModel):
+    page: int
+    page_size: int
+    has_more: bool
+    truncated: bool = False
+    results: List[Dict[str, Any]]
+
 # --- 1. PROACTIVE WELCOME (Triggered on Widget Open) ---
 @router.get("/welcome", response_model=ChatResponse)
-async def get_welcome(x_session_id: str = Header(...)) -> ChatResponse:
+async def get_welcome(
+    x_session_id: str = Header(...),
+    idempotency_key: Optional[str] = Header(None),
+) -> ChatResponse:
     try:
-        data = chat_service.get_welcome_package(x_session_id)
+        key = coalescer.build_key(x_session_id, "welcome", idempotency_key=idempotency_key)
+        data = await coalescer.run(key, "", chat_service.get_welcome_package, x_session_id)
         return ChatResponse(
             response=str(data["response"]),
             recommendations=list(data["recommendations"]),
             intent=str(data["intent"])
         )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- 2. MESSAGE PROCESSING (The Core Intelligence) ---
 @router.post("/message", response_model=ChatResponse)
-async def post_message(request: ChatRequest, x_session_id: str = Header(...)) -> ChatResponse:
+async def post_message(
+    request: ChatRequest,
+    x_session_id: str = Header(...),
+    idempotency_key: Optional[str] = Header(None),
+) -> ChatResponse:
     try:
-        result = chat_service.get_response(request.message, x_session_id)
+        key = coalescer.build_key(x_session_id, "message", request.message, idempotency_key)
+        result = await coalescer.run(key, request.message, chat_service.get_response, request.message, x_session_id)
         
         # Format the file URL strictly for static serving if a PDF was generated
         file_url = f"/downloads/{result['file_download']}" if result.get("file_download") else None
@@ -47,6 +69,8 @@ async def post_message(request: ChatRequest, x_session_id: str = Header(...)) ->
             intent=str(result["intent"]),
             file_url=file_url
         )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -62,4 +86,35 @@ async def get_analytics(limit: int = 50) -> List[Dict[str, Any]]:
         return history
     except Exception as e:
         print(f"Analytics Route Error: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to fetch analytics: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to fetch analytics: {str(e)}")
+
+# --- 4. ADMIN HISTORY SEARCH (Support & Compliance) ---
+# Plain `def`: FastAPI runs it in the threadpool so a search never blocks /message or /welcome
+@router.get("/analytics/search", response_model=HistorySearchResponse)
+def search_history(
+    q: str = Query(..., min_length=1),
+    intent: Optional[str] = None,
+    session_id: Optional[str] = None,
+    # `date` first so a date picker's "2026-10-19" parses as a whole day, not midnight
+    date_from: Optional[Union[date, datetime]] = None,
+    date_to: Optional[Union[date, datetime]] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(25, ge=1, le=200),
+    sort: str = Query("recent", pattern="^(recent|relevance)$"),
+) -> HistorySearchResponse:
+    """
+    BA View: Full-text search over user_message and bot_response (e.g. "VA", "closing costs").
+    Backed by the SQLite FTS5 index, so it scans the whole history rather than the latest rows.
+    Date-only bounds are inclusive whole UTC days; full timestamps are compared exactly.
+    Unfiltered `relevance` ranks only the newest 10,000 hits and reports `truncated`.
+    """
+    try:
+        data = chat_service.search_history(
+            q, intent=intent, session_id=session_id,
+            date_from=date_from, date_to=date_to,
+            page=page, page_size=page_size, sort=sort,
+        )
+        return HistorySearchResponse(**data)
+    except Exception as e:
+        print(f"History Search Route Error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to search history: {str(e)}")
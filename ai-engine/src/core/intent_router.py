@@ -0,0 +1,70 @@
+from typing import TYPE_CHECKING, List, NamedTuple, Optional
+
+# Annotation only: chat_service must keep surviving a failed knowledge_base import
+if TYPE_CHECKING:
+    from src.core.knowledge_base import WebsiteKnowledgeBase
+
+DEFAULT_GREETINGS = ["hi", "hello", "hey", "start", "greetings"]
+DEFAULT_PDF_TRIGGERS = ["pdf", "report", "download", "sheet"]
+
+
+class RouteResult(NamedTuple):
+    response: str
+    recommendations: List[str]
+    intent: str
+    kb_entry_id: Optional[str] = None
+
+
+class IntentRouter:
+    """
+    Side-effect-free intent classification for Sarah.
+    PO/BA Note: ChatService uses this live; the replay tool runs it with candidate
+    KB/keyword configs against historical messages before a routing change ships.
+    """
+
+    def __init__(
+        self,
+        kb: Optional["WebsiteKnowledgeBase"],
+        greetings: Optional[List[str]] = None,
+        pdf_triggers: Optional[List[str]] = None,
+    ) -> None:
+        self.kb = kb
+        self.greetings = greetings if greetings is not None else list(DEFAULT_GREETINGS)
+        self.pdf_triggers = pdf_triggers if pdf_triggers is not None else list(DEFAULT_PDF_TRIGGERS)
+
+    def route(self, msg: str) -> RouteResult:
+        """Classifies an already lowercased/stripped message. PDF rendering is left to the caller."""
+        if any(x in msg for x in self.pdf_triggers):
+            return RouteResult(
+                "I've generated your custom Rate Sheet PDF. You can download it below.",
+                ["Speak to an LO", "Calculator"],
+                "download_pdf",
+            )
+
+        # 🟢 DEMO FIX: Safely check KB
+        if self.kb:
+            try:
+                entry, _ = self.kb.match(msg)
+            except Exception as e:
+                print(f"🔥 KB Search Error: {e}")
+                entry = None
+            if entry is not None:
+                return RouteResult(
+                    str(entry["content"]),
+                    list(entry["recommendations"]),
+                    str(entry["intent"]),
+                    str(entry["id"]),
+                )
+
+        if any(w in msg for w in self.greetings):
+            return RouteResult(
+                "Hello! I'm here to simplify your mortgage. Would you like to see today's rates?",
+                ["View Rates", "Monthly Calc"],
+                "greeting",
+            )
+
+        return RouteResult(
+            "I can certainly help with that! Would you like to download our current rate sheet or compare loan options?",
+            ["Rate Sheet PDF", "Compare Loans"],
+            "fallback",
+        )
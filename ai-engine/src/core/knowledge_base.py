@@ -9,7 +9,7 @@ class KnowledgeEntry(TypedDict):
     intent: str
 
 class WebsiteKnowledgeBase:
-    def __init__(self) -> None:
+    def __init__(self, entries: Optional[List[KnowledgeEntry]] = None, threshold: float = 0.4) -> None:
         # 🟢 DATA LAYER: Hardened Knowledge Base
         self._knowledge_data: List[KnowledgeEntry] = [
             {
@@ -35,18 +35,23 @@ class WebsiteKnowledgeBase:
             }
         ]
 
+        # 🟢 OVERRIDES: Candidate KB/threshold for offline replay (see src/tools/replay_history.py)
+        if entries is not None:
+            self._knowledge_data = list(entries)
+        self.threshold = threshold
+
     def _preprocess(self, text: str) -> List[str]:
         """Cleans and tokenizes input."""
         return re.sub(r'[^\w\s%]', '', text.lower()).split()
 
-    def search(self, query: str) -> Tuple[Optional[str], List[str], str, float]:
+    def match(self, query: str) -> Tuple[Optional[KnowledgeEntry], float]:
         """
         Ranked Keyword Search Engine.
         PO/BA Note: Tuned to favor exact keyword density over phrase length.
         """
         tokens = self._preprocess(query)
         if not tokens:
-            return None, [], "fallback", 0.0
+            return None, 0.0
 
         best_match: Optional[KnowledgeEntry] = None
         highest_score: float = 0.0
@@ -69,12 +74,20 @@ class WebsiteKnowledgeBase:
                     best_match = entry
 
         # 🟢 THRESHOLD: Only return results Sarah is confident about
-        if highest_score < 0.4 or best_match is None:
+        if highest_score < self.threshold or best_match is None:
+            return None, 0.0
+
+        return best_match, float(highest_score)
+
+    def search(self, query: str) -> Tuple[Optional[str], List[str], str, float]:
+        """Returns (content, recommendations, intent, score) for the best entry."""
+        best_match, score = self.match(query)
+        if best_match is None:
             return None, [], "fallback", 0.0
 
         return (
             str(best_match["content"]),
             list(best_match["recommendations"]),
             str(best_match["intent"]),
-            float(highest_score)
+            score
         )
\ No newline at end of file
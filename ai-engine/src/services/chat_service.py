@@ -1,10 +1,12 @@
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from sqlalchemy import create_engine, desc
 from sqlalchemy.orm import sessionmaker, Session
-from datetime import datetime
+from datetime import date, datetime
 
 from src.core.models import Base, ChatInteraction
+from src.core.intent_router import IntentRouter, DEFAULT_GREETINGS
+from src.services.history_search import ensure_fts_index, search_interactions
 # If this import fails, Sarah will now survive it
 try:
     from src.core.knowledge_base import WebsiteKnowledgeBase
@@ -25,9 +27,15 @@ try:
 except Exception as e:
     print(f"🔥 DB Warning: Could not create tables: {e}")
 
+# 🟢 SEARCH: FTS5 index over chat history (kept in sync by SQLite triggers)
+try:
+    ensure_fts_index(engine)
+except Exception as e:
+    print(f"🔥 DB Warning: Full-text search index unavailable: {e}")
+
 class ChatService:
     def __init__(self) -> None:
-        self.greetings = ["hi", "hello", "hey", "start", "greetings"]
+        self.greetings = list(DEFAULT_GREETINGS)
         os.makedirs("downloads", exist_ok=True)
         
         # 🟢 DEMO FIX: Prevent KB failure from crashing the server
@@ -38,6 +46,8 @@ class ChatService:
             except Exception as e:
                 print(f"🔥 KB Warning: Knowledge base offline: {e}")
 
+        self.router = IntentRouter(self.kb, greetings=self.greetings)
+
     def _get_db(self) -> Session:
         return SessionLocal()
 
@@ -177,35 +187,11 @@ class ChatService:
         msg = user_message.lower().strip()
         
         try:
-            response_text = ""
-            recommendations = []
-            intent = "general"
+            response_text, recommendations, intent, _ = self.router.route(msg)
             file_download = None
 
-            if any(x in msg for x in ["pdf", "report", "download", "sheet"]):
+            if intent == "download_pdf":
                 file_download = self.generate_rate_sheet(session_id)
-                response_text = "I've generated your custom Rate Sheet PDF. You can download it below."
-                recommendations = ["Speak to an LO", "Calculator"]
-                intent = "download_pdf"
-            else:
-                # 🟢 DEMO FIX: Safely check KB
-                kb_content = None
-                if self.kb:
-                    try:
-                        kb_content, kb_recs, kb_intent, _ = self.kb.search(msg)
-                    except Exception as e:
-                        print(f"🔥 KB Search Error: {e}")
-                
-                if kb_content:
-                    response_text, recommendations, intent = kb_content, kb_recs, kb_intent
-                elif any(w in msg for w in self.greetings):
-                    response_text = "Hello! I'm here to simplify your mortgage. Would you like to see today's rates?"
-                    recommendations = ["View Rates", "Monthly Calc"]
-                    intent = "greeting"
-                else:
-                    response_text = "I can certainly help with that! Would you like to download our current rate sheet or compare loan options?"
-                    recommendations = ["Rate Sheet PDF", "Compare Loans"]
-                    intent = "fallback"
 
             # 🟢 DEMO FIX: Safely save interaction
             try:
@@ -270,4 +256,27 @@ class ChatService:
                 db.close()
         except Exception as e:
             print(f"🔥 Analytics Error: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    # --- 6. ADMIN FULL-TEXT SEARCH ---
+    def search_history(
+        self,
+        query: str,
+        intent: Optional[str] = None,
+        session_id: Optional[str] = None,
+        date_from: Optional[Union[date, datetime]] = None,
+        date_to: Optional[Union[date, datetime]] = None,
+        page: int = 1,
+        page_size: int = 25,
+        sort: str = "recent",
+    ) -> Dict[str, Any]:
+        """Indexed search across every logged conversation, not just the latest N rows."""
+        db = self._get_db()
+        try:
+            return search_interactions(
+                db, query, intent=intent, session_id=session_id,
+                date_from=date_from, date_to=date_to,
+                page=page, page_size=page_size, sort=sort,
+            )
+        finally:
+            db.close()
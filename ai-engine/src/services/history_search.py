@@ -0,0 +1,203 @@
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# --- FTS5 SCHEMA ---
+# External-content index: the text lives once in chat_interactions, FTS5 only
+# stores the inverted index. Triggers keep it in sync with every insert/update/delete.
+FTS_TABLE = "chat_interactions_fts"
+
+_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        user_message, bot_response,
+        content='chat_interactions', content_rowid='id',
+        tokenize='unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS chat_interactions_fts_ai AFTER INSERT ON chat_interactions BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, user_message, bot_response)
+        VALUES (new.id, new.user_message, new.bot_response);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS chat_interactions_fts_ad AFTER DELETE ON chat_interactions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, user_message, bot_response)
+        VALUES ('delete', old.id, old.user_message, old.bot_response);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS chat_interactions_fts_au AFTER UPDATE ON chat_interactions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, user_message, bot_response)
+        VALUES ('delete', old.id, old.user_message, old.bot_response);
+        INSERT INTO {FTS_TABLE}(rowid, user_message, bot_response)
+        VALUES (new.id, new.user_message, new.bot_response);
+    END
+    """,
+]
+
+# "relevance" ranks only the newest N hits; bm25 over every hit of a common term is what costs seconds
+RELEVANCE_WINDOW = 10000
+
+# Matches the format SQLAlchemy's DateTime type writes to SQLite, so range filters compare as strings
+SQLITE_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def to_sqlite_utc(value: datetime) -> str:
+    """save_interaction stores naive UTC, so aware filters are converted before formatting."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime(SQLITE_DATETIME_FORMAT)
+
+
+def _build_filters(
+    intent: Optional[str],
+    session_id: Optional[str],
+    date_from: Optional[Union[date, datetime]],
+    date_to: Optional[Union[date, datetime]],
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Row filters on chat_interactions (aliased `c`). A plain date (what a dashboard
+    date picker sends) covers that whole UTC day: date_from starts at its midnight and
+    date_to stops before the next day's midnight. Datetimes are compared as given.
+    """
+    filters: List[str] = []
+    params: Dict[str, Any] = {}
+    if intent:
+        filters.append("c.detected_intent = :intent")
+        params["intent"] = intent
+    if session_id:
+        filters.append("c.session_id = :session_id")
+        params["session_id"] = session_id
+    if date_from:
+        if not isinstance(date_from, datetime):
+            date_from = datetime.combine(date_from, time.min)
+        filters.append("c.timestamp >= :date_from")
+        params["date_from"] = to_sqlite_utc(date_from)
+    if date_to:
+        if isinstance(date_to, datetime):
+            filters.append("c.timestamp <= :date_to")
+            params["date_to"] = to_sqlite_utc(date_to)
+        else:
+            filters.append("c.timestamp < :date_to")
+            params["date_to"] = to_sqlite_utc(datetime.combine(date_to + timedelta(days=1), time.min))
+    return filters, params
+
+
+def ensure_fts_index(engine: Engine) -> None:
+    """Creates the FTS5 index and sync triggers, backfilling existing rows on first run."""
+    with engine.begin() as conn:
+        already_exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first() is not None
+        for ddl in _FTS_DDL:
+            conn.execute(text(ddl))
+        if not already_exists:
+            # 🟢 BACKFILL: Index history logged before search existed
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turns free text from the dashboard into a safe FTS5 MATCH expression.
+    "Quoted phrases" stay phrases, every other word becomes a quoted term, and all
+    terms are ANDed. Quoting neutralizes FTS5 operators typed by staff.
+    """
+    terms: List[str] = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        tokens = re.findall(r"\w+", phrase or word)
+        if tokens:
+            terms.append('"' + " ".join(tokens) + '"')
+    return " ".join(terms) if terms else None
+
+
+def search_interactions(
+    db: Session,
+    query: str,
+    intent: Optional[str] = None,
+    session_id: Optional[str] = None,
+    date_from: Optional[Union[date, datetime]] = None,
+    date_to: Optional[Union[date, datetime]] = None,
+    page: int = 1,
+    page_size: int = 25,
+    sort: str = "recent",
+) -> Dict[str, Any]:
+    """
+    Paginated full-text search over user_message and bot_response.
+    PO/BA Note: No exact total is computed (counting every hit on every page is what
+    made common terms slow); `has_more` is derived by fetching one extra row instead.
+    "recent" walks the index in rowid order and stops after the page, so it stays in
+    milliseconds on millions of rows. "relevance" with any filter ranks every filtered
+    hit; without filters it ranks only the newest RELEVANCE_WINDOW hits and sets
+    `truncated` when older hits were left out (`has_more` then ends at the window).
+    """
+    match = build_match_query(query)
+    if match is None:
+        return {"page": page, "page_size": page_size, "has_more": False, "truncated": False, "results": []}
+
+    row_filters, params = _build_filters(intent, session_id, date_from, date_to)
+    filters = [f"{FTS_TABLE} MATCH :match", *row_filters]
+    params["match"] = match
+    truncated = False
+
+    if sort == "relevance" and row_filters:
+        # Filtered: rank every hit that passes the filters, so a session/date search never
+        # loses older matches. bm25() is only evaluated for rows that survive the join.
+        order_by = f"bm25({FTS_TABLE})"
+    elif sort == "relevance":
+        # Unfiltered: rank only the newest RELEVANCE_WINDOW hits. The rowid floor is
+        # pushed into the FTS5 scan, so common terms are not scored across all history.
+        floor = db.execute(
+            text(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match "
+                "ORDER BY rowid DESC LIMIT 1 OFFSET :window"
+            ),
+            {"match": match, "window": RELEVANCE_WINDOW},
+        ).scalar()
+        if floor is not None:
+            truncated = True
+            filters.append(f"{FTS_TABLE}.rowid > :floor")
+            params["floor"] = floor
+        order_by = f"{FTS_TABLE}.rank"
+    else:
+        # Ids are assigned in insert order, so rowid DESC is newest-first without a sort step
+        order_by = f"{FTS_TABLE}.rowid DESC"
+
+    where = " AND ".join(filters)
+
+    rows = db.execute(
+        text(
+            "SELECT c.id, c.session_id, c.user_message, c.bot_response, c.detected_intent, c.timestamp, "
+            f"snippet({FTS_TABLE}, -1, '<mark>', '</mark>', '…', 12) AS snippet "
+            f"FROM {FTS_TABLE} JOIN chat_interactions c ON c.id = {FTS_TABLE}.rowid "
+            f"WHERE {where} ORDER BY {order_by} LIMIT :limit OFFSET :offset"
+        ),
+        {**params, "limit": page_size + 1, "offset": (page - 1) * page_size},
+    ).mappings().all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    return {
+        "page": page,
+        "page_size": page_size,
+        "has_more": has_more,
+        "truncated": truncated,
+        "results": [
+            {
+                "id": r["id"],
+                "session_id": r["session_id"],
+                "user_message": r["user_message"],
+                "bot_response": r["bot_response"],
+                "intent": r["detected_intent"],
+                "timestamp": r["timestamp"].replace(" ", "T") if r["timestamp"] else None,
+                "snippet": r["snippet"],
+            }
+            for r in rows
+        ],
+    }
@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+CoalesceKey = Tuple[str, str, str]
+
+
+def normalize_message(message: str) -> str:
+    """Lowercases and collapses whitespace so trivially different duplicates share a key."""
+    return re.sub(r"\s+", " ", message.lower()).strip()
+
+
+def message_fingerprint(message: str) -> str:
+    return hashlib.sha256(normalize_message(message).encode("utf-8")).hexdigest()
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an Idempotency-Key is reused with a different message."""
+
+
+class RequestCoalescer:
+    """
+    Single-flight layer for the chat endpoints.
+    PO/BA Note: The widget fires /welcome twice on mount and users double-click
+    recommendation buttons. Duplicates await the one in-flight computation and
+    reuse its result for a short window, so we log one ChatInteraction row and
+    render one PDF per logical request.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 3.0,
+        idempotency_ttl_seconds: float = 600.0,
+        max_entries: int = 10000,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.idempotency_ttl_seconds = idempotency_ttl_seconds
+        self.max_entries = max_entries
+        # key -> (message fingerprint, task computing the result)
+        self._in_flight: Dict[CoalesceKey, Tuple[str, "asyncio.Task[Any]"]] = {}
+        # key -> (expires_at, message fingerprint, result); insertion-ordered so eviction drops the oldest
+        self._completed: "OrderedDict[CoalesceKey, Tuple[float, str, Any]]" = OrderedDict()
+
+    @staticmethod
+    def build_key(
+        session_id: str,
+        endpoint: str,
+        message: str = "",
+        idempotency_key: Optional[str] = None,
+    ) -> CoalesceKey:
+        # 🟢 An explicit Idempotency-Key wins over the message-derived key
+        if idempotency_key:
+            return (session_id, endpoint, f"idem:{idempotency_key}")
+        return (session_id, endpoint, f"msg:{normalize_message(message)}")
+
+    @staticmethod
+    def _is_cacheable(result: Any) -> bool:
+        # ChatService swallows its own failures and answers with "error_recovery";
+        # caching that would replay a transient DB/PDF error to every retry.
+        return not (isinstance(result, dict) and result.get("intent") == "error_recovery")
+
+    @staticmethod
+    def _check_fingerprint(key: CoalesceKey, stored: str, fingerprint: str) -> None:
+        if stored != fingerprint:
+            raise IdempotencyConflict(f"Idempotency-Key '{key[2][len('idem:'):]}' was already used with a different message")
+
+    def _lookup(self, key: CoalesceKey, fingerprint: str) -> Tuple[bool, Any]:
+        cached = self._completed.get(key)
+        if cached is None:
+            return False, None
+        expires_at, stored_fingerprint, result = cached
+        if expires_at < time.monotonic():
+            del self._completed[key]
+            return False, None
+        self._check_fingerprint(key, stored_fingerprint, fingerprint)
+        return True, result
+
+    def _store(self, key: CoalesceKey, fingerprint: str, result: Any) -> None:
+        ttl = self.idempotency_ttl_seconds if key[2].startswith("idem:") else self.window_seconds
+        self._completed[key] = (time.monotonic() + ttl, fingerprint, result)
+        self._completed.move_to_end(key)
+        while len(self._completed) > self.max_entries:
+            self._completed.popitem(last=False)
+
+    async def _compute(self, key: CoalesceKey, fingerprint: str, fn: Callable[..., Any], args: Tuple[Any, ...]) -> Any:
+        try:
+            result = await asyncio.to_thread(fn, *args)
+            if self._is_cacheable(result):
+                self._store(key, fingerprint, result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def run(self, key: CoalesceKey, message: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs the blocking `fn(*args)` in a worker thread unless an identical call
+        is in flight or recently finished, in which case its result is shared.
+        Exceptions and "error_recovery" answers are not cached, so a retry recomputes.
+        Raises IdempotencyConflict if the key was used for a different message.
+        """
+        fingerprint = message_fingerprint(message)
+        hit, result = self._lookup(key, fingerprint)
+        if hit:
+            return result
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self._check_fingerprint(key, pending[0], fingerprint)
+            task = pending[1]
+        else:
+            task = asyncio.ensure_future(self._compute(key, fingerprint, fn, args))
+            # Mark errors retrieved so a failure nobody is waiting on does not log a warning
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._in_flight[key] = (fingerprint, task)
+
+        # 🟢 SHIELD: A cancelled caller must not cancel the shared computation; the
+        # thread's result still completes the task and is cached for duplicates/retries.
+        return await asyncio.shield(task)
@@ -0,0 +1,317 @@
+"""
+Offline replay of historical chats against a candidate routing configuration.
+
+PO/BA Note: Run this before shipping KB, threshold or keyword changes to see how
+many past conversations would now get a different intent or answer.
+
+    python -m src.tools.replay_history --candidate candidate.json --output report.json
+
+A config file is JSON with any of these keys (missing keys keep today's behavior):
+
+    {
+        "knowledge_base": [{"id": ..., "keywords": [...], "content": ..., "recommendations": [...], "intent": ...}],
+        "threshold": 0.4,
+        "greetings": ["hi", "hello"],
+        "pdf_triggers": ["pdf", "report"]
+    }
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from src.core.intent_router import IntentRouter
+from src.core.knowledge_base import WebsiteKnowledgeBase
+from src.services.history_search import to_sqlite_utc
+
+DEFAULT_DB_PATH = "./chat_history.db"
+MAX_EXAMPLES_PER_TRANSITION = 3
+
+# Required KnowledgeEntry keys and the types a candidate config must use for them
+_ENTRY_FIELDS = {"id": str, "keywords": list, "content": str, "recommendations": list, "intent": str}
+_LIST_FIELDS = ("keywords", "recommendations")
+
+# Per-worker routers, built once by _init_worker instead of per chunk
+_routers: Optional[Tuple[IntentRouter, IntentRouter]] = None
+
+
+def _is_str_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def validate_config(config: Any) -> Dict[str, Any]:
+    """Rejects malformed configs up front instead of crashing a worker mid-replay."""
+    if not isinstance(config, dict):
+        raise ValueError("config must be a JSON object")
+
+    unknown = set(config) - {"knowledge_base", "threshold", "greetings", "pdf_triggers"}
+    if unknown:
+        raise ValueError(f"unknown config keys: {', '.join(sorted(unknown))}")
+
+    if "threshold" in config:
+        threshold = config["threshold"]
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)):
+            raise ValueError("'threshold' must be a number")
+
+    for key in ("greetings", "pdf_triggers"):
+        if key in config and not _is_str_list(config[key]):
+            raise ValueError(f"'{key}' must be a list of strings")
+
+    if "knowledge_base" in config:
+        entries = config["knowledge_base"]
+        if not isinstance(entries, list):
+            raise ValueError("'knowledge_base' must be a list of entries")
+        for i, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                raise ValueError(f"knowledge_base[{i}] must be an object")
+            for field, expected in _ENTRY_FIELDS.items():
+                if field not in entry:
+                    raise ValueError(f"knowledge_base[{i}] is missing '{field}'")
+                if not isinstance(entry[field], expected):
+                    raise ValueError(f"knowledge_base[{i}].{field} must be a {expected.__name__}")
+            for field in _LIST_FIELDS:
+                if not _is_str_list(entry[field]):
+                    raise ValueError(f"knowledge_base[{i}].{field} must be a list of strings")
+    return config
+
+
+def load_config(path: Optional[str]) -> Dict[str, Any]:
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return validate_config(json.load(f))
+
+
+def build_router(config: Dict[str, Any]) -> IntentRouter:
+    kb = WebsiteKnowledgeBase(
+        entries=config.get("knowledge_base"),
+        threshold=float(config.get("threshold", 0.4)),
+    )
+    return IntentRouter(kb, greetings=config.get("greetings"), pdf_triggers=config.get("pdf_triggers"))
+
+
+def _init_worker(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> None:
+    global _routers
+    _routers = (build_router(baseline), build_router(candidate))
+
+
+def _new_stats() -> Dict[str, Any]:
+    return {
+        "total": 0,
+        "answer_changed": 0,
+        "baseline_intents": Counter(),
+        "candidate_intents": Counter(),
+        "transitions": Counter(),
+        "baseline_entry_hits": Counter(),
+        "candidate_entry_hits": Counter(),
+        "examples": {},
+    }
+
+
+def replay_chunk(messages: List[str]) -> Dict[str, Any]:
+    """Classifies one chunk with both routers and returns aggregated counts only."""
+    assert _routers is not None, "replay_chunk called before _init_worker"
+    baseline, candidate = _routers
+    stats = _new_stats()
+
+    # 🟢 DEDUPE: Chat traffic is highly repetitive (button clicks), route each distinct message once
+    for msg, n in Counter(m.lower().strip() for m in messages).items():
+        before = baseline.route(msg)
+        after = candidate.route(msg)
+
+        stats["total"] += n
+        stats["baseline_intents"][before.intent] += n
+        stats["candidate_intents"][after.intent] += n
+        if before.kb_entry_id:
+            stats["baseline_entry_hits"][before.kb_entry_id] += n
+        if after.kb_entry_id:
+            stats["candidate_entry_hits"][after.kb_entry_id] += n
+        if before.response != after.response:
+            stats["answer_changed"] += n
+        if before.intent != after.intent:
+            transition = (before.intent, after.intent)
+            stats["transitions"][transition] += n
+            examples = stats["examples"].setdefault(transition, [])
+            if len(examples) < MAX_EXAMPLES_PER_TRANSITION:
+                examples.append(msg)
+    return stats
+
+
+def _merge(into: Dict[str, Any], part: Dict[str, Any]) -> None:
+    into["total"] += part["total"]
+    into["answer_changed"] += part["answer_changed"]
+    for key in ("baseline_intents", "candidate_intents", "transitions", "baseline_entry_hits", "candidate_entry_hits"):
+        into[key].update(part[key])
+    for transition, examples in part["examples"].items():
+        kept = into["examples"].setdefault(transition, [])
+        for example in examples:
+            if len(kept) < MAX_EXAMPLES_PER_TRANSITION and example not in kept:
+                kept.append(example)
+
+
+def stream_messages(
+    db_path: str,
+    chunk_size: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> Iterator[List[str]]:
+    """
+    Streams user messages in id order using keyset pagination, so memory stays flat
+    regardless of table size. Synthetic rows such as "[Started New Session]" are skipped.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        filters = ["id > ?", "user_message IS NOT NULL", "NOT (user_message LIKE '[%' AND user_message LIKE '%]')"]
+        params: List[Any] = []
+        if since:
+            filters.append("timestamp >= ?")
+            params.append(to_sqlite_utc(since))
+        if until:
+            filters.append("timestamp <= ?")
+            params.append(to_sqlite_utc(until))
+        sql = f"SELECT id, user_message FROM chat_interactions WHERE {' AND '.join(filters)} ORDER BY id LIMIT ?"
+
+        last_id, remaining = 0, limit
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            rows = conn.execute(sql, [last_id, *params, size]).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+            yield [row[1] for row in rows]
+    finally:
+        conn.close()
+
+
+def run_replay(
+    chunks: Iterator[List[str]],
+    baseline: Dict[str, Any],
+    candidate: Dict[str, Any],
+    workers: int,
+) -> Dict[str, Any]:
+    stats = _new_stats()
+
+    if workers <= 0:
+        _init_worker(baseline, candidate)
+        for chunk in chunks:
+            _merge(stats, replay_chunk(chunk))
+        return stats
+
+    # 🟢 BACKPRESSURE: Keep only a few chunks queued per worker instead of reading the whole table
+    max_pending = workers * 2
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(baseline, candidate)) as pool:
+        pending: Set["Future[Dict[str, Any]]"] = set()
+        for chunk in chunks:
+            pending.add(pool.submit(replay_chunk, chunk))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _merge(stats, future.result())
+        for future in pending:
+            _merge(stats, future.result())
+    return stats
+
+
+def build_report(stats: Dict[str, Any], elapsed_seconds: float) -> Dict[str, Any]:
+    total = stats["total"]
+
+    def rate(intents: Counter) -> float:
+        return round(intents["fallback"] / total, 4) if total else 0.0
+
+    entry_ids = sorted(set(stats["baseline_entry_hits"]) | set(stats["candidate_entry_hits"]))
+    return {
+        "messages_replayed": total,
+        "elapsed_seconds": round(elapsed_seconds, 2),
+        "intent_changed": sum(stats["transitions"].values()),
+        "answer_changed": stats["answer_changed"],
+        "fallback_rate": {
+            "baseline": rate(stats["baseline_intents"]),
+            "candidate": rate(stats["candidate_intents"]),
+            "delta": round(rate(stats["candidate_intents"]) - rate(stats["baseline_intents"]), 4),
+        },
+        "transitions": [
+            {"from": before, "to": after, "count": count, "examples": stats["examples"].get((before, after), [])}
+            for (before, after), count in stats["transitions"].most_common()
+        ],
+        "intents": {
+            "baseline": dict(stats["baseline_intents"].most_common()),
+            "candidate": dict(stats["candidate_intents"].most_common()),
+        },
+        "entry_hits": {
+            entry_id: {
+                "baseline": stats["baseline_entry_hits"][entry_id],
+                "candidate": stats["candidate_entry_hits"][entry_id],
+            }
+            for entry_id in entry_ids
+        },
+    }
+
+
+def print_summary(report: Dict[str, Any]) -> None:
+    fallback = report["fallback_rate"]
+    print(f"✅ Replayed {report['messages_replayed']:,} messages in {report['elapsed_seconds']}s")
+    print(f"   Intent changed: {report['intent_changed']:,}   Answer changed: {report['answer_changed']:,}")
+    print(f"   Fallback rate: {fallback['baseline']:.2%} -> {fallback['candidate']:.2%} ({fallback['delta']:+.2%})")
+    if report["transitions"]:
+        print("   Intent transitions:")
+        for t in report["transitions"]:
+            print(f"     {t['from']} -> {t['to']}: {t['count']:,}")
+    print("   KB entry hits (baseline -> candidate):")
+    for entry_id, hits in report["entry_hits"].items():
+        print(f"     {entry_id}: {hits['baseline']:,} -> {hits['candidate']:,}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay historical chats against a candidate Sarah routing config.")
+    parser.add_argument("--candidate", required=True, help="JSON config to evaluate")
+    parser.add_argument("--baseline", help="JSON config to compare against (default: current production routing)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Path to the chat_history SQLite database")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Only replay messages at or after this ISO timestamp")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Only replay messages at or before this ISO timestamp")
+    parser.add_argument("--limit", type=int, help="Stop after this many messages")
+    parser.add_argument("--chunk-size", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Process pool size (0 runs inline)")
+    parser.add_argument("--output", help="Write the full JSON diff report to this path")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found: {args.db}", file=sys.stderr)
+        return 1
+
+    configs = {}
+    for name, path in (("baseline", args.baseline), ("candidate", args.candidate)):
+        try:
+            configs[name] = load_config(path)
+        except (OSError, ValueError) as e:
+            # json.JSONDecodeError is a ValueError, so syntax errors land here too
+            print(f"❌ Invalid {name} config {path}: {e}", file=sys.stderr)
+            return 1
+
+    started = time.perf_counter()
+    stats = run_replay(
+        stream_messages(args.db, args.chunk_size, since=args.since, until=args.until, limit=args.limit),
+        configs["baseline"],
+        configs["candidate"],
+        args.workers,
+    )
+    report = build_report(stats, time.perf_counter() - started)
+
+    print_summary(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"   Full report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())